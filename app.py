@@ -1,7 +1,9 @@
 import os
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 
 # ==============================
 # PAGE CONFIG
@@ -109,619 +111,880 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ==============================
-# LOAD DATA (CACHED)
+# KONSTANTA
 # ==============================
-@st.cache_data
-def load_data():
-    path = os.path.join("data", "covid_clean.csv.gz")
+# Estimasi populasi untuk menghitung kasus per kapita
+POPULATION_ESTIMATES = {
+    "US": 331000000, "India": 1380000000, "Brazil": 213000000,
+    "Russia": 146000000, "UK": 67000000, "France": 65000000,
+    "Turkey": 84000000, "Italy": 60000000, "Spain": 47000000,
+    "Germany": 83000000
+}
 
+# ==============================
+# LOAD DATA (CACHED)
+# ==============================
+def parse_csv(path):
     df = pd.read_csv(
         path,
         compression="gzip",
         parse_dates=["tanggal"]
     )
 
-    # Pastikan tipe data numerik
-    df["kasus_harian"] = pd.to_numeric(df["kasus_harian"], errors="coerce")
-    df["kasus_kumulatif"] = pd.to_numeric(df["kasus_kumulatif"], errors="coerce")
+    # Pastikan tipe data numerik, diperkecil ke int32/float32 agar hemat memori.
+    # kasus_harian berisi NaN (hari pertama tiap negara) sehingga tetap float.
+    df["kasus_harian"] = pd.to_numeric(df["kasus_harian"], errors="coerce", downcast="float")
+    df["kasus_kumulatif"] = pd.to_numeric(df["kasus_kumulatif"], errors="coerce", downcast="integer")
+    df["latitude"] = df["latitude"].astype("float32")
+    df["longitude"] = df["longitude"].astype("float32")
+
+    # Negara sebagai kategori: isin/groupby bekerja pada kode integer
+    df["negara"] = df["negara"].astype("category")
+
+    # Urutkan sekali per tanggal (stabil) agar filter rentang tanggal cukup dengan searchsorted
+    df = df.sort_values("tanggal", kind="mergesort").reset_index(drop=True)
 
     return df
 
 
-df = load_data()
+# Versi format salinan Parquet; naikkan setiap kali parse_csv berubah
+# (tipe data, urutan baris) agar salinan lama tidak terpakai lagi
+PARQUET_VERSION = 2
 
-# ==============================
-# SIDEBAR - FILTERS
-# ==============================
-st.sidebar.title("Filter Data")
 
-negara_list = sorted(df["negara"].unique())
-default_negara = ["Indonesia", "US", "India"]
+@st.cache_data
+def load_data():
+    path = os.path.join("data", "covid_clean.csv.gz")
+    parquet_path = path.replace(".csv.gz", f".v{PARQUET_VERSION}.parquet")
+
+    # Pakai salinan Parquet (tipe data sudah final) selama tidak lebih lama dari CSV;
+    # file rusak/terpotong atau tanpa pyarrow -> baca ulang dari CSV
+    df = None
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(path):
+        try:
+            df = pd.read_parquet(parquet_path)
+        except (ImportError, OSError, ValueError):
+            df = None
+
+    if df is None:
+        df = parse_csv(path)
+
+        # Simpan sekali sebagai Parquet lewat file sementara lalu os.replace (atomik),
+        # sehingga crash atau dua sesi yang menulis bersamaan tidak meninggalkan
+        # file terpotong; jika gagal, dashboard tetap berjalan dari CSV
+        tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+        try:
+            df.to_parquet(tmp_path, compression="snappy", index=False)
+            os.replace(tmp_path, parquet_path)
+        except (ImportError, OSError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # Daftar negara dan rentang tanggal ikut di-cache bersama data
+    return df, df["negara"].cat.categories.tolist(), df["tanggal"].min(), df["tanggal"].max()
+
+
+# ==============================
+# FUNGSI ANALISIS (CACHED)
+# ==============================
+def daily_totals(df_f: pd.DataFrame) -> pd.DataFrame:
+    # Satu baris per (negara, tanggal): provinsi dijumlahkan sehingga N baris
+    # terakhir tiap negara benar-benar N hari (NaN tetap NaN jika semua NaN)
+    return (
+        df_f.groupby(["negara", "tanggal"], observed=True)["kasus_harian"]
+        .sum(min_count=1)
+        .reset_index()
+    )
 
-negara_selected = st.sidebar.multiselect(
-    "Pilih Negara",
-    negara_list,
-    default=[n for n in default_negara if n in negara_list]
-)
 
-min_date = df["tanggal"].min()
-max_date = df["tanggal"].max()
+def group_bounds(df_f: pd.DataFrame) -> np.ndarray:
+    # Batas baris tiap negara (indptr): baris negara ke-i ada di
+    # indptr[i]:indptr[i + 1]; df_f adalah hasil daily_totals (terurut
+    # per negara, lalu tanggal, satu baris per hari)
+    codes = df_f["negara"].cat.codes.to_numpy()
+    return np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1, [len(codes)]])
 
-date_range = st.sidebar.date_input(
-    "Rentang Tanggal",
-    [min_date, max_date],
-    min_value=min_date,
-    max_value=max_date
-)
 
-# ==============================
-# FILTER DATA
-# ==============================
-df_filtered = df[
-    (df["negara"].isin(negara_selected)) &
-    (df["tanggal"] >= pd.to_datetime(date_range[0])) &
-    (df["tanggal"] <= pd.to_datetime(date_range[1]))
-].copy()
+def window_mean(values: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    # Rata-rata values[lo:hi] untuk banyak jendela sekaligus (NaN diabaikan)
+    values = values.astype(np.float64)
+    valid = ~np.isnan(values)
+    csum = np.concatenate([[0], np.cumsum(np.where(valid, values, 0))])
+    count = np.concatenate([[0], np.cumsum(valid)])
 
-# ==============================
-# HEADER
-# ==============================
-st.title("COVID-19 Global Analytics Dashboard")
-st.markdown(
-    """
-    Dashboard ini menyajikan analisis perkembangan COVID-19 secara global,
-    mencakup tren kasus harian dan distribusi geografis antar negara.
-    """
-)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (csum[hi] - csum[lo]) / (count[hi] - count[lo])
 
-# ==============================
-# KPI SECTION
-# ==============================
-latest_date = df_filtered["tanggal"].max()
 
-total_cases = int(df_filtered["kasus_kumulatif"].max())
-avg_daily = int(df_filtered["kasus_harian"].mean())
-total_countries = df_filtered["negara"].nunique()
+def snapshot_at(frame: pd.DataFrame, date) -> pd.DataFrame:
+    # Kasus kumulatif per lokasi (negara/provinsi) pada satu tanggal
+    return (
+        frame[frame["tanggal"] == date]
+        .groupby(["negara", "latitude", "longitude"], as_index=False, observed=True)
+        .agg({"kasus_kumulatif": "max"})
+    )
 
-col1, col2, col3 = st.columns(3)
 
-col1.metric("Total Kasus", f"{total_cases:,}")
-col2.metric("Rata-rata Kasus Harian", f"{avg_daily:,}")
-col3.metric("Jumlah Negara", total_countries)
+def country_totals(snapshot: pd.DataFrame) -> pd.DataFrame:
+    # Ringkas snapshot per lokasi menjadi satu baris per negara
+    return (
+        snapshot
+        .groupby("negara", as_index=False, observed=True)
+        .agg({"kasus_kumulatif": "max"})
+    )
 
-st.divider()
 
-# ==============================
-# MAP - GLOBAL DISTRIBUTION
-# ==============================
-st.subheader("Sebaran Global Kasus COVID-19")
+def pie_hover(names, values, pct) -> np.ndarray:
+    # Teks hover pie disusun sekali di Python, bukan diformat per titik di browser
+    return (
+        "<b>" + pd.Series(names).astype(str) + "</b><br>"
+        "Total Kasus: " + pd.Series(values).map("{:,}".format) + "<br>"
+        "Kontribusi: " + pd.Series(pct).map("{:.1f}%".format)
+    ).to_numpy()
 
-df_map = (
-    df_filtered[df_filtered["tanggal"] == latest_date]
-    .groupby(["negara", "latitude", "longitude"], as_index=False)
-    .agg({"kasus_kumulatif": "max"})
-)
 
-fig_map = px.scatter_geo(
-    df_map,
-    lat="latitude",
-    lon="longitude",
-    size="kasus_kumulatif",
-    color="kasus_kumulatif",
-    hover_name="negara",
-    size_max=50,
-    projection="natural earth",
-    title=f"Sebaran Kasus COVID-19 Global (per {latest_date.date()})",
-    color_continuous_scale="Reds"
-)
+@st.cache_data
+def filter_df(countries: tuple, d0, d1) -> pd.DataFrame:
+    df = load_data()[0]
 
-# Responsive height untuk map
-fig_map.update_layout(height=500)
-st.plotly_chart(fig_map, use_container_width=True)
+    # df terurut per tanggal: batas rentang dicari dengan binary search
+    lo = df["tanggal"].searchsorted(pd.to_datetime(d0), side="left")
+    hi = df["tanggal"].searchsorted(pd.to_datetime(d1), side="right")
+    df_range = df.iloc[lo:hi]
 
-st.markdown(
-    """
-    **Insight:**  
-    Peta menunjukkan pola distribusi kasus COVID-19 yang tidak merata secara global. 
-    Titik-titik dengan ukuran besar (kasus tinggi) terkonsentrasi di wilayah dengan 
-    populasi padat dan mobilitas tinggi seperti Amerika Serikat, India, dan Brasil. 
-    Distribusi ini mencerminkan bagaimana faktor kepadatan penduduk dan konektivitas global 
-    mempercepat penyebaran virus dibandingkan negara-negara dengan populasi lebih kecil 
-    atau lokasi yang lebih terisolasi.
-    """
-)
+    # Cocokkan negara lewat kode kategori (integer), bukan perbandingan string
+    sel_codes = df["negara"].cat.categories.get_indexer(list(countries))
+    mask = np.isin(df_range["negara"].cat.codes.to_numpy(), sel_codes[sel_codes >= 0])
 
-st.divider()
+    # Urutkan per negara (stabil, tetap kronologis) agar baris tiap negara bersebelahan
+    return df_range[mask].sort_values("negara", kind="mergesort")
 
-# ==============================
-# TIME SERIES - TREND KASUS HARIAN
-# ==============================
-st.subheader("Tren Kasus Harian COVID-19")
-
-fig_trend = px.line(
-    df_filtered,
-    x="tanggal",
-    y="kasus_harian",
-    color="negara",
-    title="Tren Kasus Harian COVID-19 (Data Aktual)",
-    labels={
-        "kasus_harian": "Kasus Harian",
-        "tanggal": "Tanggal"
-    },
-    line_shape="spline"
-)
 
-# Responsive height untuk line chart
-fig_trend.update_layout(height=450)
-st.plotly_chart(fig_trend, use_container_width=True)
+@st.cache_data
+def kpi(df_f: pd.DataFrame) -> dict:
+    return {
+        "latest_date": df_f["tanggal"].max(),
+        "total_cases": int(df_f["kasus_kumulatif"].max()),
+        "avg_daily": int(df_f["kasus_harian"].mean()),
+        "total_countries": df_f["negara"].nunique(),
+    }
 
-# ==============================
-# DYNAMIC INSIGHT - TREND KASUS HARIAN
-# ==============================
-# Temukan puncak kasus harian tertinggi
-if not df_filtered.empty:
-    peak_global = df_filtered.loc[df_filtered["kasus_harian"].idxmax()]
-    negara_peak = peak_global["negara"]
-    tanggal_peak = peak_global["tanggal"].strftime("%d %B %Y")
-    nilai_peak = int(peak_global["kasus_harian"])
-    
-    # Analisis tren terkini
-    latest_data = df_filtered[df_filtered["tanggal"] == latest_date]
-    trend_analysis = []
-    
-    for negara in negara_selected:
-        country_data = df_filtered[df_filtered["negara"] == negara]
-        if len(country_data) >= 7:
-            latest_week = country_data.tail(7)["kasus_harian"].mean()
-            prev_week = country_data.tail(14).head(7)["kasus_harian"].mean()
-            
-            if prev_week > 0:
-                change_pct = ((latest_week - prev_week) / prev_week) * 100
-                if change_pct > 20:
-                    trend = f"meningkat {change_pct:.0f}%"
-                elif change_pct < -20:
-                    trend = f"menurun {abs(change_pct):.0f}%"
-                else:
-                    trend = "stabil"
-                trend_analysis.append(f"{negara} ({trend})")
-    
-    trend_text = ", ".join(trend_analysis) if trend_analysis else "tidak cukup data untuk analisis tren"
-    
-    st.markdown(
-        f"""
-        **Insight Tren Kasus Harian:**  
-        **{negara_peak}** mencatat **rekor kasus harian tertinggi** pada **{tanggal_peak}** dengan **{nilai_peak:,} kasus dalam satu hari**. 
-        Puncak ini terjadi karena kombinasi faktor: varian baru yang lebih menular, pelonggaran pembatasan sosial, 
-        atau peningkatan kapasitas testing. Analisis tren 7 hari terakhir menunjukkan: {trend_text}. 
-        Fluktuasi kasus harian yang tajam menunjukkan sensitivitas pandemi terhadap perubahan kebijakan 
-        dan perilaku masyarakat.
-        """
-    )
-else:
-    st.info("Tidak ada data yang tersedia untuk analisis tren.")
 
-st.divider()
+@st.cache_data
+def latest_snapshot(df_f: pd.DataFrame, latest_date) -> pd.DataFrame:
+    return snapshot_at(df_f, latest_date)
 
-# ==============================
-# PEAK ANALYSIS - DATA HARIAN
-# ==============================
-st.subheader("Rekor Kasus Harian Tertinggi per Negara")
 
-if not df_filtered.empty:
-    df_peak = (
-        df_filtered
-        .loc[df_filtered.groupby("negara")["kasus_harian"].idxmax()]
-        .sort_values("kasus_harian", ascending=False)
-    )
-    
-    df_peak_display = df_peak[[
-        "negara", "tanggal", "kasus_harian"
-    ]].rename(columns={
-        "negara": "Negara",
-        "tanggal": "Tanggal Rekor",
-        "kasus_harian": "Kasus Harian Tertinggi"
-    })
-    
-    # Format tanggal untuk display
-    df_peak_display["Tanggal Rekor"] = df_peak_display["Tanggal Rekor"].dt.strftime("%Y-%m-%d")
-    
-    # Responsive dataframe height
-    display_height = min(300, len(df_peak_display) * 35 + 40)
-    st.dataframe(
-        df_peak_display,
-        use_container_width=True,
-        height=display_height
-    )
-    
-    # Analisis pola waktu rekor
-    if len(df_peak) > 1:
-        # Konversi tanggal ke quarter
-        df_peak["quarter"] = df_peak["tanggal"].dt.to_period("Q")
-        quarter_counts = df_peak["quarter"].value_counts().sort_index()
-        
-        peak_quarter = quarter_counts.idxmax().strftime("Q%q %Y")
-        peak_count = quarter_counts.max()
-        
-        # Hitung rentang waktu antar rekor
-        date_range_days = (df_peak["tanggal"].max() - df_peak["tanggal"].min()).days
-        
-        st.markdown(
-            f"""
-            **Insight Analisis Rekor Harian:**  
-            Negara-negara mencapai rekor kasus harian dalam rentang **{date_range_days} hari**, 
-            dengan konsentrasi tertinggi pada **{peak_quarter}** ({peak_count} negara). 
-            Perbedaan waktu pencapaian rekor ini menunjukkan: (1) Gelombang pandemi yang tidak sinkron, 
-            (2) Efektivitas respons awal yang berbeda, (3) Waktu masuknya varian baru yang bervariasi. 
-            Negara dengan rekor lebih awal cenderung mengalami gelombang pertama lebih cepat, 
-            sementara yang lebih lambat mungkin mendapat manfaat dari pembelajaran negara lain.
-            """
+@st.cache_data
+def trend_plot_data(df_f: pd.DataFrame) -> tuple:
+    # Kasus harian nasional: provinsi dijumlahkan dulu sebelum dirata-rata
+    df_plot = daily_totals(df_f)
+
+    # Rata-rata mingguan untuk rentang panjang, data harian apa adanya untuk
+    # rentang pendek; flag kedua menentukan judul grafik
+    span = df_f["tanggal"].max() - df_f["tanggal"].min()
+    weekly = span > pd.Timedelta(days=180)
+    if weekly:
+        df_plot = (
+            df_plot.set_index("tanggal")
+            .groupby("negara", observed=True)["kasus_harian"]
+            .resample("W").mean()
+            .reset_index()
         )
-else:
-    st.info("Tidak ada data untuk analisis rekor harian.")
 
-st.divider()
+    return df_plot, weekly
 
-# ==============================
-# KONTRIBUSI GLOBAL - DATA KUMULATIF
-# ==============================
-st.subheader("Kontribusi Kasus COVID-19 terhadap Total Dunia (%)")
 
-# Tanggal global terbaru
-latest_global_date = df["tanggal"].max()
+@st.cache_data
+def trend_summary(df_f: pd.DataFrame, countries: tuple) -> dict:
+    # Kasus harian nasional (jumlah semua provinsi) per tanggal
+    daily = daily_totals(df_f)
+
+    # Temukan puncak kasus harian tertinggi
+    peak_global = daily.loc[daily["kasus_harian"].idxmax()]
+
+    # Analisis tren terkini: 7 hari terakhir vs 7 hari sebelumnya,
+    # dihitung dengan aritmetika indeks pada batas tiap negara
+    indptr = group_bounds(daily)
+    starts, ends = indptr[:-1], indptr[1:]
+    window = np.minimum(ends - starts, 14)
+    vals = daily["kasus_harian"].to_numpy()
+
+    stats = pd.DataFrame({
+        "size": ends - starts,
+        "latest_week": window_mean(vals, np.maximum(ends - 7, starts), ends),
+        "prev_week": window_mean(vals, ends - window, np.minimum(ends - window + 7, ends)),
+    }, index=daily["negara"].iloc[starts].astype(str)).reindex(list(countries))
+
+    stats = stats[(stats["size"] >= 7) & (stats["prev_week"] > 0)]
+    change_pct = (stats["latest_week"] - stats["prev_week"]) / stats["prev_week"] * 100
+
+    # Rentang kurang dari 7 hari bisa membuat stats kosong
+    trend_analysis = []
+    if not stats.empty:
+        trend = np.where(
+            change_pct > 20,
+            "meningkat " + change_pct.map("{:.0f}%".format),
+            np.where(change_pct < -20, "menurun " + change_pct.abs().map("{:.0f}%".format), "stabil")
+        )
+        trend_analysis = (stats.index.astype(str) + " (" + trend + ")").tolist()
 
-# Data global (TIDAK TERFILTER SIDEBAR)
-df_global_pie = (
-    df[df["tanggal"] == latest_global_date]
-    .groupby("negara", as_index=False)
-    .agg({"kasus_kumulatif": "max"})
-)
+    return {
+        "negara_peak": peak_global["negara"],
+        "tanggal_peak": peak_global["tanggal"],
+        "nilai_peak": int(peak_global["kasus_harian"]),
+        "trend_analysis": trend_analysis,
+    }
 
-# Hitung total global
-total_global_cases = df_global_pie["kasus_kumulatif"].sum()
-df_global_pie["persentase"] = (
-    df_global_pie["kasus_kumulatif"] / total_global_cases * 100
-)
 
-# Ambil top 10 negara
-top_n = 10
-df_top = df_global_pie.sort_values(
-    "kasus_kumulatif", ascending=False
-).head(top_n)
-
-df_others = pd.DataFrame({
-    "negara": ["Lainnya"],
-    "kasus_kumulatif": [
-        total_global_cases - df_top["kasus_kumulatif"].sum()
-    ],
-    "persentase": [
-        100 - df_top["persentase"].sum()
-    ]
-})
-
-df_pie_final = pd.concat([df_top, df_others], ignore_index=True)
-
-# Pie (Donut) chart dengan responsive height
-fig_pie = px.pie(
-    df_pie_final,
-    values="kasus_kumulatif",
-    names="negara",
-    hole=0.45,
-    title=f"Distribusi Kasus COVID-19 Global (per {latest_global_date.date()})"
-)
+@st.cache_data
+def peak_table(df_f: pd.DataFrame) -> pd.DataFrame:
+    daily = daily_totals(df_f)
+    indptr = group_bounds(daily)
+    vals = daily["kasus_harian"].fillna(-np.inf).to_numpy()
+    peaks = [start + vals[start:end].argmax() for start, end in zip(indptr[:-1], indptr[1:])]
 
-fig_pie.update_traces(
-    textinfo="label+percent",
-    hovertemplate="<b>%{label}</b><br>"
-                  "Total Kasus: %{value:,}<br>"
-                  "Kontribusi: %{percent}<extra></extra>"
-)
+    return daily.iloc[peaks].sort_values("kasus_harian", ascending=False)
 
-fig_pie.update_layout(
-    legend_title_text="Negara",
-    margin=dict(t=80, b=40),
-    height=500  # Responsive height
-)
 
-st.plotly_chart(fig_pie, use_container_width=True)
+@st.cache_data
+def recent_daily_mean(df_f: pd.DataFrame, days: int) -> pd.Series:
+    # Rata-rata kasus harian nasional pada `days` hari terakhir tiap negara, terbesar dulu
+    daily = daily_totals(df_f)
+    indptr = group_bounds(daily)
+    starts, ends = indptr[:-1], indptr[1:]
+    means = window_mean(daily["kasus_harian"].to_numpy(), np.maximum(ends - days, starts), ends)
 
-# Analisis distribusi kontribusi
-if not df_top.empty:
-    top5_contribution = df_top.head(5)["persentase"].sum()
-    top10_contribution = df_top["persentase"].sum()
-    
-    # Hitung Gini coefficient sederhana
-    sorted_pct = sorted(df_top["persentase"])
-    n = len(sorted_pct)
-    cum_sum = sum(sorted_pct)
-    gini_numerator = sum((i + 1) * sorted_pct[i] for i in range(n))
-    gini_coefficient = (2 * gini_numerator) / (n * cum_sum) - (n + 1) / n
-    
-    st.markdown(
-        f"""
-        **Insight Distribusi Global:**  
-        **10 negara teratas** menyumbang **{top10_contribution:.1f}%** kasus global, 
-        dengan **5 teratas** saja mencapai **{top5_contribution:.1f}%**. 
-        Konsentrasi ekstrem ini (koefisien Gini: {gini_coefficient:.3f}) menunjukkan ketimpangan besar 
-        dalam beban pandemi. Faktor penyebab: (1) Populasi besar (China, India), 
-        (2) Mobilitas global tinggi (AS, Eropa), (3) Kapasitas testing yang berbeda, 
-        (4) Kerentanan sistem kesehatan. "Lainnya" ({180-top_n}+ negara) hanya berkontribusi **{100-top10_contribution:.1f}%**, 
-        yang bisa mengindikasikan keberhasilan pengendalian atau keterbatasan pelaporan.
-        """
+    return pd.Series(
+        means, index=daily["negara"].iloc[starts].astype(str)
+    ).sort_values(ascending=False, kind="mergesort")
+
+
+@st.cache_data
+def selected_distribution(df_f: pd.DataFrame, latest_date) -> dict:
+    # Dipakai bersama oleh bar chart dan pie chart negara terpilih
+    df_pie_filtered = country_totals(latest_snapshot(df_f, latest_date))
+    total_filtered = df_pie_filtered["kasus_kumulatif"].sum()
+
+    dist = {
+        "df_pie_filtered": df_pie_filtered,
+        "total_filtered": total_filtered,
+        "max_country": None,
+        "min_country": None,
+        "ratio": None,
+        "highest_daily": None,
+    }
+
+    if total_filtered > 0:
+        df_pie_filtered["persentase"] = (df_pie_filtered["kasus_kumulatif"] / total_filtered) * 100
+
+        if len(df_pie_filtered) > 1:
+            max_country = df_pie_filtered.loc[df_pie_filtered["kasus_kumulatif"].idxmax()]
+            min_country = df_pie_filtered.loc[df_pie_filtered["kasus_kumulatif"].idxmin()]
+
+            # Hitung kasus harian rata-rata terakhir
+            recent_daily = recent_daily_mean(df_f, 30)
+
+            dist.update({
+                "max_country": max_country.to_dict(),
+                "min_country": min_country.to_dict(),
+                "ratio": max_country["kasus_kumulatif"] / min_country["kasus_kumulatif"],
+                "highest_daily": (recent_daily.index[0], recent_daily.iloc[0]) if not recent_daily.empty else ("N/A", 0),
+            })
+
+    return dist
+
+
+@st.cache_data
+def volatility(df_f: pd.DataFrame, countries: tuple) -> pd.DataFrame:
+    # Satuan sama dengan tabel rekor dan insight tren: kasus harian nasional
+    stats = (
+        daily_totals(df_f).groupby("negara", observed=True)["kasus_harian"]
+        .agg(["size", "mean", "std", "max", "min"])
+        .reindex(list(countries))
     )
+    stats = stats[stats["size"] > 1]
 
-st.divider()
+    # Semua negara hanya punya satu baris (mis. rentang satu hari)
+    if stats.empty:
+        return pd.DataFrame()
 
-# ==============================
-# TOP 10 COUNTRIES - TOTAL KASUS
-# ==============================
-st.subheader("10 Negara dengan Total Kasus Tertinggi")
-
-top10 = (
-    df
-    .groupby("negara")["kasus_kumulatif"]
-    .max()
-    .sort_values(ascending=False)
-    .head(10)
-    .reset_index()
-)
+    # Koefisien variasi = standar deviasi / rata-rata
+    cv = (stats["std"] / stats["mean"] * 100).where(stats["mean"] > 0, 0)
 
-fig_top10 = px.bar(
-    top10,
-    x="kasus_kumulatif",
-    y="negara",
-    orientation="h",
-    title="10 Negara dengan Total Kasus COVID-19 Tertinggi",
-    labels={"kasus_kumulatif": "Total Kasus", "negara": "Negara"},
-    color="kasus_kumulatif",
-    color_continuous_scale="Blues"
-)
+    return pd.DataFrame({
+        "Negara": stats.index.astype(str),
+        "Rata-rata Harian": stats["mean"].map("{:,.0f}".format),
+        "Standar Deviasi": stats["std"].map("{:,.0f}".format),
+        "Koefisien Variasi": cv.map("{:.1f}%".format),
+        "Rentang (Max-Min)": stats["max"].map("{:,.0f}".format) + " - " + stats["min"].map("{:,.0f}".format)
+    }).reset_index(drop=True)
 
-fig_top10.update_layout(
-    yaxis=dict(categoryorder="total ascending"),
-    height=450  # Responsive height
-)
 
-st.plotly_chart(fig_top10, use_container_width=True)
+# Parameter berawalan "_" tidak di-hash oleh Streamlit: df dasar sudah
+# di-cache oleh load_data dan hanya bergantung pada file sumber.
+@st.cache_data
+def global_pie(_df: pd.DataFrame, latest) -> pd.DataFrame:
+    df_global_pie = country_totals(snapshot_at(_df, latest))
+
+    # Hitung persentase terhadap total global
+    df_global_pie["persentase"] = (
+        df_global_pie["kasus_kumulatif"] / df_global_pie["kasus_kumulatif"].sum() * 100
+    )
+
+    return df_global_pie.sort_values("kasus_kumulatif", ascending=False)
+
+
+@st.cache_data
+def top10_all(_df: pd.DataFrame) -> pd.DataFrame:
+    return (
+        _df
+        .groupby("negara", observed=True)["kasus_kumulatif"]
+        .max()
+        .sort_values(ascending=False)
+        .head(10)
+        .reset_index()
+    )
+
+
+# ==============================
+# BAGIAN DASHBOARD
+# ==============================
+def show_map(df_filtered: pd.DataFrame, latest_date):
+    st.subheader("Sebaran Global Kasus COVID-19")
+
+    # Snapshot tanggal terbaru (cached) juga dipakai oleh distribusi negara terpilih
+    df_map = latest_snapshot(df_filtered, latest_date)
+
+    # Ukuran titik sebanding luas (akar kasus), maksimum 50px seperti size_max sebelumnya
+    map_cases = df_map["kasus_kumulatif"]
+    map_sizes = np.sqrt(map_cases / max(map_cases.max(), 1)) * 50
+
+    # Teks hover disusun sekali di Python, bukan per titik di browser
+    map_hover = df_map["negara"].astype(str) + "<br>Total Kasus: " + map_cases.map("{:,}".format)
+
+    # Scattermap dirender dengan WebGL
+    fig_map = go.Figure(go.Scattermap(
+        lat=df_map["latitude"],
+        lon=df_map["longitude"],
+        mode="markers",
+        marker=dict(
+            size=map_sizes,
+            color=map_cases,
+            colorscale="Reds",
+            colorbar=dict(title="Total Kasus")
+        ),
+        text=map_hover,
+        hoverinfo="text"
+    ))
+
+    # Responsive height untuk map
+    fig_map.update_layout(
+        title=f"Sebaran Kasus COVID-19 Global (per {latest_date.date()})",
+        map=dict(style="carto-positron", zoom=0.6, center=dict(lat=20, lon=0)),
+        margin=dict(t=60, b=10, l=10, r=10),
+        height=500,
+        uirevision="map"  # pertahankan zoom/pan di browser antar rerun
+    )
+    st.plotly_chart(fig_map, use_container_width=True)
 
-# Analisis top 10
-if not top10.empty:
-    # Hitung rasio antara peringkat 1 dan 10
-    ratio_1_to_10 = top10.iloc[0]["kasus_kumulatif"] / top10.iloc[9]["kasus_kumulatif"]
-    
-    # Hitung rata-rata kasus per kapita (estimasi)
-    population_estimates = {
-        "US": 331000000, "India": 1380000000, "Brazil": 213000000,
-        "Russia": 146000000, "UK": 67000000, "France": 65000000,
-        "Turkey": 84000000, "Italy": 60000000, "Spain": 47000000,
-        "Germany": 83000000
-    }
-    
-    # Hitung kasus per 1000 penduduk untuk negara yang ada data
-    cases_per_capita = []
-    for idx, row in top10.iterrows():
-        country = row["negara"]
-        if country in population_estimates:
-            per_1000 = (row["kasus_kumulatif"] / population_estimates[country]) * 1000
-            cases_per_capita.append((country, per_1000))
-    
-    cases_per_capita.sort(key=lambda x: x[1], reverse=True)
-    highest_per_capita = cases_per_capita[0] if cases_per_capita else ("N/A", 0)
-    
     st.markdown(
-        f"""
-        **Insight Ranking Global:**  
-        **{top10.iloc[0]['negara']}** memiliki **{ratio_1_to_10:.1f}x** lebih banyak kasus dibanding peringkat ke-10. 
-        Dari segi kepadatan kasus (per 1000 penduduk), **{highest_per_capita[0]}** memimpin dengan **{highest_per_capita[1]:.1f} kasus/1000 penduduk**. 
-        Ranking ini tidak mencerminkan keseluruhan situasi karena: (1) Variasi kapasitas testing, 
-        (2) Perbedaan definisi kasus, (3) Strategi pelaporan yang berbeda. 
-        Negara dengan testing lebih agresif cenderung memiliki angka kasus lebih tinggi.
+        """
+        **Insight:**  
+        Peta menunjukkan pola distribusi kasus COVID-19 yang tidak merata secara global. 
+        Titik-titik dengan ukuran besar (kasus tinggi) terkonsentrasi di wilayah dengan 
+        populasi padat dan mobilitas tinggi seperti Amerika Serikat, India, dan Brasil. 
+        Distribusi ini mencerminkan bagaimana faktor kepadatan penduduk dan konektivitas global 
+        mempercepat penyebaran virus dibandingkan negara-negara dengan populasi lebih kecil 
+        atau lokasi yang lebih terisolasi.
         """
     )
 
-st.divider()
 
-# ==============================
-# DISTRIBUSI NEGARA TERPILIH
-# ==============================
-st.subheader("Distribusi Kasus di Negara Terpilih")
+def show_trend(df_filtered: pd.DataFrame, negara_selected: list):
+    st.subheader("Tren Kasus Harian COVID-19")
 
-if not df_filtered.empty:
-    # Ambil data terbaru per negara berdasarkan filter
-    df_pie_filtered = (
-        df_filtered[df_filtered["tanggal"] == latest_date]
-        .groupby("negara", as_index=False)
-        .agg({"kasus_kumulatif": "max"})
+    df_trend, weekly = trend_plot_data(df_filtered)
+
+    fig_trend = px.line(
+        df_trend,
+        x="tanggal",
+        y="kasus_harian",
+        color="negara",
+        title="Tren Kasus Harian COVID-19 (Rata-rata Mingguan)" if weekly else "Tren Kasus Harian COVID-19 (Data Aktual)",
+        labels={
+            "kasus_harian": "Kasus Harian",
+            "tanggal": "Tanggal"
+        },
+        line_shape="linear",
+        render_mode="webgl"
     )
-    
-    # Hitung persentase
-    total_filtered = df_pie_filtered["kasus_kumulatif"].sum()
-    if total_filtered > 0:
-        df_pie_filtered["persentase"] = (df_pie_filtered["kasus_kumulatif"] / total_filtered) * 100
-        
-        # Bar chart untuk perbandingan lebih jelas
-        fig_bar_filtered = px.bar(
-            df_pie_filtered.sort_values("kasus_kumulatif", ascending=True),
-            x="kasus_kumulatif",
-            y="negara",
-            orientation="h",
-            title=f"Perbandingan Total Kasus ({len(negara_selected)} Negara Terpilih)",
-            labels={"kasus_kumulatif": "Total Kasus", "negara": "Negara"},
-            color="kasus_kumulatif",
-            color_continuous_scale="Viridis"
+
+    # Responsive height untuk line chart; hover hanya titik terdekat
+    fig_trend.update_layout(height=450, hovermode="closest", uirevision="trend")
+    st.plotly_chart(fig_trend, use_container_width=True)
+
+    # Insight dinamis: puncak dan tren 7 hari terakhir
+    if not df_filtered.empty:
+        trend_data = trend_summary(df_filtered, tuple(negara_selected))
+        negara_peak = trend_data["negara_peak"]
+        tanggal_peak = trend_data["tanggal_peak"].strftime("%d %B %Y")
+        nilai_peak = trend_data["nilai_peak"]
+        trend_analysis = trend_data["trend_analysis"]
+
+        trend_text = ", ".join(trend_analysis) if trend_analysis else "tidak cukup data untuk analisis tren"
+
+        st.markdown(
+            f"""
+            **Insight Tren Kasus Harian:**  
+            **{negara_peak}** mencatat **rekor kasus harian tertinggi** pada **{tanggal_peak}** dengan **{nilai_peak:,} kasus dalam satu hari**. 
+            Puncak ini terjadi karena kombinasi faktor: varian baru yang lebih menular, pelonggaran pembatasan sosial, 
+            atau peningkatan kapasitas testing. Analisis tren 7 hari terakhir menunjukkan: {trend_text}. 
+            Fluktuasi kasus harian yang tajam menunjukkan sensitivitas pandemi terhadap perubahan kebijakan 
+            dan perilaku masyarakat.
+            """
         )
-        
-        # Responsive height untuk bar chart
-        fig_bar_filtered.update_layout(height=400)
-        st.plotly_chart(fig_bar_filtered, use_container_width=True)
-        
-        # Analisis distribusi terfilter
-        if len(df_pie_filtered) > 1:
-            max_country = df_pie_filtered.loc[df_pie_filtered["kasus_kumulatif"].idxmax()]
-            min_country = df_pie_filtered.loc[df_pie_filtered["kasus_kumulatif"].idxmin()]
-            ratio = max_country['kasus_kumulatif'] / min_country['kasus_kumulatif']
-            
-            # Hitung kasus harian rata-rata terakhir
-            recent_daily = []
-            for negara in df_pie_filtered["negara"]:
-                country_recent = df_filtered[df_filtered["negara"] == negara].tail(30)
-                avg_daily = country_recent["kasus_harian"].mean() if not country_recent.empty else 0
-                recent_daily.append((negara, avg_daily))
-            
-            recent_daily.sort(key=lambda x: x[1], reverse=True)
-            highest_daily = recent_daily[0] if recent_daily else ("N/A", 0)
-            
+    else:
+        st.info("Tidak ada data yang tersedia untuk analisis tren.")
+
+
+def show_peak_table(df_filtered: pd.DataFrame):
+    st.subheader("Rekor Kasus Harian Tertinggi per Negara")
+
+    if not df_filtered.empty:
+        df_peak = peak_table(df_filtered)
+
+        df_peak_display = df_peak[[
+            "negara", "tanggal", "kasus_harian"
+        ]].rename(columns={
+            "negara": "Negara",
+            "tanggal": "Tanggal Rekor",
+            "kasus_harian": "Kasus Harian Tertinggi"
+        })
+
+        # Format tanggal untuk display
+        df_peak_display["Tanggal Rekor"] = df_peak_display["Tanggal Rekor"].dt.strftime("%Y-%m-%d")
+
+        # Responsive dataframe height
+        display_height = min(300, len(df_peak_display) * 35 + 40)
+        st.dataframe(
+            df_peak_display,
+            use_container_width=True,
+            height=display_height
+        )
+
+        # Analisis pola waktu rekor
+        if len(df_peak) > 1:
+            # Konversi tanggal ke kode quarter integer (tahun * 4 + indeks quarter)
+            t = df_peak["tanggal"]
+            q = (t.dt.year.to_numpy() * 4 + (t.dt.month.to_numpy() - 1) // 3).astype(np.int16)
+            quarter_counts = np.bincount(q - q.min())
+
+            peak_q = quarter_counts.argmax() + q.min()
+            peak_quarter = f"Q{peak_q % 4 + 1} {peak_q // 4}"
+            peak_count = quarter_counts.max()
+
+            # Hitung rentang waktu antar rekor
+            date_range_days = (df_peak["tanggal"].max() - df_peak["tanggal"].min()).days
+
             st.markdown(
                 f"""
-                **Insight Perbandingan Negara Terpilih:**  
-                **{max_country['negara']}** memiliki **{ratio:.1f}x** lebih banyak kasus total dibanding **{min_country['negara']}**. 
-                Dalam 30 hari terakhir, **{highest_daily[0]}** mencatat rata-rata **{highest_daily[1]:.0f} kasus/hari** (tertinggi). 
-                Perbedaan ini dipengaruhi oleh: ukuran populasi, fase pandemi saat ini, 
-                kebijakan testing, dan efektivitas program vaksinasi di masing-masing negara.
+                **Insight Analisis Rekor Harian:**  
+                Negara-negara mencapai rekor kasus harian dalam rentang **{date_range_days} hari**, 
+                dengan konsentrasi tertinggi pada **{peak_quarter}** ({peak_count} negara). 
+                Perbedaan waktu pencapaian rekor ini menunjukkan: (1) Gelombang pandemi yang tidak sinkron, 
+                (2) Efektivitas respons awal yang berbeda, (3) Waktu masuknya varian baru yang bervariasi. 
+                Negara dengan rekor lebih awal cenderung mengalami gelombang pertama lebih cepat, 
+                sementara yang lebih lambat mungkin mendapat manfaat dari pembelajaran negara lain.
                 """
             )
     else:
-        st.info("Total kasus pada negara terpilih adalah nol.")
-else:
-    st.info("Silakan pilih negara untuk melihat distribusi kasus.")
+        st.info("Tidak ada data untuk analisis rekor harian.")
+
+
+def show_global_pie(df: pd.DataFrame, latest_global_date):
+    st.subheader("Kontribusi Kasus COVID-19 terhadap Total Dunia (%)")
+
+    # Data global (TIDAK TERFILTER)
+    df_global_pie = global_pie(df, latest_global_date)
+
+    # Hitung total global
+    total_global_cases = df_global_pie["kasus_kumulatif"].sum()
+
+    # Ambil top 10 negara
+    top_n = 10
+    df_top = df_global_pie.head(top_n)
+
+    # Top 10 + "Lainnya" langsung sebagai array (tanpa membuat DataFrame baru)
+    pie_names = np.concatenate([df_top["negara"].astype(str).to_numpy(), ["Lainnya"]])
+    pie_values = np.concatenate([
+        df_top["kasus_kumulatif"].to_numpy(),
+        [total_global_cases - df_top["kasus_kumulatif"].sum()]
+    ])
+    pie_pct = np.concatenate([df_top["persentase"].to_numpy(), [100 - df_top["persentase"].sum()]])
+
+    # Pie (Donut) chart dengan responsive height
+    fig_pie = go.Figure(go.Pie(
+        labels=pie_names,
+        values=pie_values,
+        hole=0.45,
+        textinfo="label+percent",
+        customdata=pie_hover(pie_names, pie_values, pie_pct),
+        hovertemplate="%{customdata}<extra></extra>"
+    ))
+
+    fig_pie.update_layout(
+        title=f"Distribusi Kasus COVID-19 Global (per {latest_global_date.date()})",
+        legend_title_text="Negara",
+        margin=dict(t=80, b=40),
+        height=500,  # Responsive height
+        uirevision="pie"
+    )
 
+    st.plotly_chart(fig_pie, use_container_width=True)
 
-st.divider()
-# ==============================
-# PIE CHART NEGARA TERPILIH
-# ==============================
-st.subheader("Distribusi Kasus di Negara Terpilih")
+    # Analisis distribusi kontribusi
+    if not df_top.empty:
+        top5_contribution = df_top.head(5)["persentase"].sum()
+        top10_contribution = df_top["persentase"].sum()
 
-if not df_filtered.empty:
-    # Ambil data terbaru per negara berdasarkan filter
-    df_pie_filtered = (
-        df_filtered[df_filtered["tanggal"] == latest_date]
-        .groupby("negara", as_index=False)
-        .agg({"kasus_kumulatif": "max"})
-    )
-    
-    # Hitung persentase
-    total_filtered = df_pie_filtered["kasus_kumulatif"].sum()
-    if total_filtered > 0:
-        df_pie_filtered["persentase"] = (df_pie_filtered["kasus_kumulatif"] / total_filtered) * 100
-        
-        # PIE CHART untuk negara terpilih
-        fig_pie_filtered = px.pie(
-            df_pie_filtered,
-            values="kasus_kumulatif",
-            names="negara",
-            hole=0.4,
-            title=f"Distribusi Kasus COVID-19 ({len(negara_selected)} Negara Terpilih)",
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        
-        fig_pie_filtered.update_traces(
-            textinfo="label+percent",
-            hovertemplate="<b>%{label}</b><br>"
-                          "Total Kasus: %{value:,}<br>"
-                          "Kontribusi: %{percent}<extra></extra>",
-            pull=[0.05 if i == df_pie_filtered["kasus_kumulatif"].idxmax() else 0 for i in range(len(df_pie_filtered))]
+        # Hitung Gini coefficient sederhana
+        sorted_pct = np.sort(df_top["persentase"].to_numpy())
+        n = sorted_pct.size
+        gini_coefficient = (2 * np.dot(np.arange(1, n + 1), sorted_pct)) / (n * sorted_pct.sum()) - (n + 1) / n
+
+        st.markdown(
+            f"""
+            **Insight Distribusi Global:**  
+            **10 negara teratas** menyumbang **{top10_contribution:.1f}%** kasus global, 
+            dengan **5 teratas** saja mencapai **{top5_contribution:.1f}%**. 
+            Konsentrasi ekstrem ini (koefisien Gini: {gini_coefficient:.3f}) menunjukkan ketimpangan besar 
+            dalam beban pandemi. Faktor penyebab: (1) Populasi besar (China, India), 
+            (2) Mobilitas global tinggi (AS, Eropa), (3) Kapasitas testing yang berbeda, 
+            (4) Kerentanan sistem kesehatan. "Lainnya" ({180-top_n}+ negara) hanya berkontribusi **{100-top10_contribution:.1f}%**, 
+            yang bisa mengindikasikan keberhasilan pengendalian atau keterbatasan pelaporan.
+            """
         )
-        
-        fig_pie_filtered.update_layout(
-            legend_title_text="Negara",
-            margin=dict(t=80, b=40),
-            showlegend=True,
-            height=450  # Responsive height
+
+
+def show_top10(df: pd.DataFrame):
+    st.subheader("10 Negara dengan Total Kasus Tertinggi")
+
+    top10 = top10_all(df)
+
+    fig_top10 = px.bar(
+        top10,
+        x="kasus_kumulatif",
+        y="negara",
+        orientation="h",
+        title="10 Negara dengan Total Kasus COVID-19 Tertinggi",
+        labels={"kasus_kumulatif": "Total Kasus", "negara": "Negara"},
+        color="kasus_kumulatif",
+        color_continuous_scale="Blues"
+    )
+
+    fig_top10.update_layout(
+        yaxis=dict(categoryorder="total ascending"),
+        height=450,  # Responsive height
+        hovermode="closest",
+        uirevision="top10"
+    )
+
+    st.plotly_chart(fig_top10, use_container_width=True)
+
+    # Analisis top 10
+    if not top10.empty:
+        # Hitung rasio antara peringkat 1 dan 10
+        ratio_1_to_10 = top10.iloc[0]["kasus_kumulatif"] / top10.iloc[9]["kasus_kumulatif"]
+
+        # Hitung kasus per 1000 penduduk untuk negara yang ada data
+        cases_per_capita = []
+        for idx, row in top10.iterrows():
+            country = row["negara"]
+            if country in POPULATION_ESTIMATES:
+                per_1000 = (row["kasus_kumulatif"] / POPULATION_ESTIMATES[country]) * 1000
+                cases_per_capita.append((country, per_1000))
+
+        cases_per_capita.sort(key=lambda x: x[1], reverse=True)
+        highest_per_capita = cases_per_capita[0] if cases_per_capita else ("N/A", 0)
+
+        st.markdown(
+            f"""
+            **Insight Ranking Global:**  
+            **{top10.iloc[0]['negara']}** memiliki **{ratio_1_to_10:.1f}x** lebih banyak kasus dibanding peringkat ke-10. 
+            Dari segi kepadatan kasus (per 1000 penduduk), **{highest_per_capita[0]}** memimpin dengan **{highest_per_capita[1]:.1f} kasus/1000 penduduk**. 
+            Ranking ini tidak mencerminkan keseluruhan situasi karena: (1) Variasi kapasitas testing, 
+            (2) Perbedaan definisi kasus, (3) Strategi pelaporan yang berbeda. 
+            Negara dengan testing lebih agresif cenderung memiliki angka kasus lebih tinggi.
+            """
         )
-        
-        st.plotly_chart(fig_pie_filtered, use_container_width=True)
-        
-        # Analisis distribusi terfilter
-        if len(df_pie_filtered) > 1:
-            max_country = df_pie_filtered.loc[df_pie_filtered["kasus_kumulatif"].idxmax()]
-            min_country = df_pie_filtered.loc[df_pie_filtered["kasus_kumulatif"].idxmin()]
-            ratio = max_country['kasus_kumulatif'] / min_country['kasus_kumulatif']
-            
-            # Hitung kasus harian rata-rata terakhir
-            recent_daily = []
-            for negara in df_pie_filtered["negara"]:
-                country_recent = df_filtered[df_filtered["negara"] == negara].tail(30)
-                avg_daily = country_recent["kasus_harian"].mean() if not country_recent.empty else 0
-                recent_daily.append((negara, avg_daily))
-            
-            recent_daily.sort(key=lambda x: x[1], reverse=True)
-            highest_daily = recent_daily[0] if recent_daily else ("N/A", 0)
-            
+
+
+def show_selected_distribution(df_filtered: pd.DataFrame, latest_date, negara_selected: list):
+    st.subheader("Distribusi Kasus di Negara Terpilih")
+
+    # Data terbaru per negara berdasarkan filter, dihitung sekali untuk bar & pie chart
+    dist = selected_distribution(df_filtered, latest_date) if not df_filtered.empty else None
+
+    if dist is not None:
+        df_pie_filtered = dist["df_pie_filtered"]
+
+        if dist["total_filtered"] > 0:
+            # Bar chart untuk perbandingan lebih jelas
+            fig_bar_filtered = px.bar(
+                df_pie_filtered.sort_values("kasus_kumulatif", ascending=True),
+                x="kasus_kumulatif",
+                y="negara",
+                orientation="h",
+                title=f"Perbandingan Total Kasus ({len(negara_selected)} Negara Terpilih)",
+                labels={"kasus_kumulatif": "Total Kasus", "negara": "Negara"},
+                color="kasus_kumulatif",
+                color_continuous_scale="Viridis"
+            )
+
+            # Responsive height untuk bar chart
+            fig_bar_filtered.update_layout(height=400, hovermode="closest", uirevision="bar_filtered")
+            st.plotly_chart(fig_bar_filtered, use_container_width=True)
+
+            # Analisis distribusi terfilter
+            if dist["max_country"] is not None:
+                max_country = dist["max_country"]
+                min_country = dist["min_country"]
+                ratio = dist["ratio"]
+                highest_daily = dist["highest_daily"]
+
+                st.markdown(
+                    f"""
+                    **Insight Perbandingan Negara Terpilih:**  
+                    **{max_country['negara']}** memiliki **{ratio:.1f}x** lebih banyak kasus total dibanding **{min_country['negara']}**. 
+                    Dalam 30 hari terakhir, **{highest_daily[0]}** mencatat rata-rata **{highest_daily[1]:.0f} kasus/hari** (tertinggi). 
+                    Perbedaan ini dipengaruhi oleh: ukuran populasi, fase pandemi saat ini, 
+                    kebijakan testing, dan efektivitas program vaksinasi di masing-masing negara.
+                    """
+                )
+        else:
+            st.info("Total kasus pada negara terpilih adalah nol.")
+    else:
+        st.info("Silakan pilih negara untuk melihat distribusi kasus.")
+
+    st.divider()
+
+    # Pie chart negara terpilih
+    st.subheader("Distribusi Kasus di Negara Terpilih")
+
+    if dist is not None:
+        df_pie_filtered = dist["df_pie_filtered"]
+
+        if dist["total_filtered"] > 0:
+            # PIE CHART untuk negara terpilih
+            fig_pie_filtered = px.pie(
+                df_pie_filtered,
+                values="kasus_kumulatif",
+                names="negara",
+                hole=0.4,
+                title=f"Distribusi Kasus COVID-19 ({len(negara_selected)} Negara Terpilih)",
+                color_discrete_sequence=px.colors.qualitative.Set3,
+                custom_data=[pie_hover(
+                    df_pie_filtered["negara"], df_pie_filtered["kasus_kumulatif"], df_pie_filtered["persentase"]
+                )]
+            )
+
+            fig_pie_filtered.update_traces(
+                textinfo="label+percent",
+                hovertemplate="%{customdata[0]}<extra></extra>",
+                pull=[0.05 if i == df_pie_filtered["kasus_kumulatif"].idxmax() else 0 for i in range(len(df_pie_filtered))]
+            )
+
+            fig_pie_filtered.update_layout(
+                legend_title_text="Negara",
+                margin=dict(t=80, b=40),
+                showlegend=True,
+                height=450,  # Responsive height
+                uirevision="pie_filtered"
+            )
+
+            st.plotly_chart(fig_pie_filtered, use_container_width=True)
+
+            # Analisis distribusi terfilter
+            if dist["max_country"] is not None:
+                max_country = dist["max_country"]
+                min_country = dist["min_country"]
+                ratio = dist["ratio"]
+                highest_daily = dist["highest_daily"]
+
+                st.markdown(
+                    f"""
+                    **Insight Distribusi Negara Terpilih:**  
+                    **{max_country['negara']}** mendominasi dengan **{max_country['persentase']:.1f}%** kasus total, 
+                    atau **{ratio:.1f}x** lebih banyak dibanding **{min_country['negara']}** ({min_country['persentase']:.1f}%). 
+                    Dalam 30 hari terakhir, **{highest_daily[0]}** mencatat rata-rata **{highest_daily[1]:.0f} kasus/hari** (tertinggi). 
+                    Distribusi ini dipengaruhi oleh: ukuran populasi, fase pandemi saat ini, 
+                    kebijakan testing, dan efektivitas program vaksinasi.
+                    """
+                )
+        else:
+            st.info("Total kasus pada negara terpilih adalah nol.")
+    else:
+        st.info("Silakan pilih negara untuk melihat distribusi kasus.")
+
+
+def show_volatility(df_filtered: pd.DataFrame, negara_selected: list):
+    st.subheader("Analisis Volatilitas Kasus Harian")
+
+    if not df_filtered.empty and len(negara_selected) > 0:
+        df_volatility = volatility(df_filtered, tuple(negara_selected))
+
+        if not df_volatility.empty:
+            # Responsive dataframe height
+            volatility_height = min(300, len(df_volatility) * 35 + 40)
+            st.dataframe(
+                df_volatility,
+                use_container_width=True,
+                hide_index=True,
+                height=volatility_height
+            )
+
+            # Insight volatilitas
+            highest_cv = df_volatility.loc[
+                df_volatility["Koefisien Variasi"].str.rstrip("%").astype(float).idxmax()
+            ]
+
             st.markdown(
                 f"""
-                **Insight Distribusi Negara Terpilih:**  
-                **{max_country['negara']}** mendominasi dengan **{max_country['persentase']:.1f}%** kasus total, 
-                atau **{ratio:.1f}x** lebih banyak dibanding **{min_country['negara']}** ({min_country['persentase']:.1f}%). 
-                Dalam 30 hari terakhir, **{highest_daily[0]}** mencatat rata-rata **{highest_daily[1]:.0f} kasus/hari** (tertinggi). 
-                Distribusi ini dipengaruhi oleh: ukuran populasi, fase pandemi saat ini, 
-                kebijakan testing, dan efektivitas program vaksinasi.
+                **Insight Volatilitas:**  
+                **{highest_cv['Negara']}** menunjukkan volatilitas tertinggi (CV: {highest_cv['Koefisien Variasi']}), 
+                mengindikasikan fluktuasi kasus harian yang sangat tidak stabil. 
+                Volatilitas tinggi biasanya disebabkan oleh: (1) Perubahan drastis kebijakan, 
+                (2) Gelombang infeksi yang tajam, (3) Variasi kapasitas testing harian, 
+                (4) Pelaporan yang tidak konsisten. Negara dengan CV rendah cenderung memiliki 
+                pola kasus yang lebih stabil dan predictable.
                 """
             )
+        else:
+            st.info("Data tidak cukup untuk analisis volatilitas.")
     else:
-        st.info("Total kasus pada negara terpilih adalah nol.")
-else:
-    st.info("Silakan pilih negara untuk melihat distribusi kasus.")
+        st.info("Pilih minimal satu negara untuk analisis volatilitas.")
+
+
+# Filter dan semua bagian yang bergantung padanya dirender dalam satu fragment:
+# perubahan filter hanya menjalankan ulang fragment ini, bukan seluruh skrip,
+# sehingga pie global dan top 10 di bawahnya tidak dieksekusi ulang.
+# Fragment tidak bisa menulis ke st.sidebar, jadi filter berada di badan halaman.
+@st.fragment
+def show_filtered_dashboard():
+    # ==============================
+    # FILTERS
+    # ==============================
+    st.subheader("Filter Data")
+
+    default_negara = ["Indonesia", "US", "India"]
+
+    col_negara, col_tanggal = st.columns([2, 1])
+
+    negara_selected = col_negara.multiselect(
+        "Pilih Negara",
+        negara_list,
+        default=[n for n in default_negara if n in negara_list]
+    )
+
+    date_range = col_tanggal.date_input(
+        "Rentang Tanggal",
+        [min_date, max_date],
+        min_value=min_date,
+        max_value=max_date
+    )
+
+    # ==============================
+    # FILTER DATA
+    # ==============================
+    df_filtered = filter_df(tuple(sorted(negara_selected)), date_range[0], date_range[1])
+
+    # ==============================
+    # KPI SECTION
+    # ==============================
+    kpi_data = kpi(df_filtered)
+    latest_date = kpi_data["latest_date"]
+
+    total_cases = kpi_data["total_cases"]
+    avg_daily = kpi_data["avg_daily"]
+    total_countries = kpi_data["total_countries"]
+
+    col1, col2, col3 = st.columns(3)
+
+    col1.metric("Total Kasus", f"{total_cases:,}")
+    col2.metric("Rata-rata Kasus Harian", f"{avg_daily:,}")
+    col3.metric("Jumlah Negara", total_countries)
+
+    st.divider()
+
+    # ==============================
+    # MAP - GLOBAL DISTRIBUTION
+    # ==============================
+    show_map(df_filtered, latest_date)
+
+    st.divider()
+
+    # ==============================
+    # TIME SERIES - TREND KASUS HARIAN
+    # ==============================
+    show_trend(df_filtered, negara_selected)
+
+    st.divider()
+
+    # ==============================
+    # PEAK ANALYSIS - DATA HARIAN
+    # ==============================
+    show_peak_table(df_filtered)
+
+    st.divider()
+
+    # ==============================
+    # DISTRIBUSI NEGARA TERPILIH
+    # ==============================
+    show_selected_distribution(df_filtered, latest_date, negara_selected)
+
+    # ==============================
+    # ANALISIS TAMBAHAN: VOLATILITAS HARIAN
+    # ==============================
+    st.divider()
+    show_volatility(df_filtered, negara_selected)
 
 
+df, negara_list, min_date, max_date = load_data()
 
 # ==============================
-# ANALISIS TAMBAHAN: VOLATILITAS HARIAN
+# HEADER
+# ==============================
+st.title("COVID-19 Global Analytics Dashboard")
+st.markdown(
+    """
+    Dashboard ini menyajikan analisis perkembangan COVID-19 secara global,
+    mencakup tren kasus harian dan distribusi geografis antar negara.
+    """
+)
+
 # ==============================
+# BAGIAN TERFILTER
+# ==============================
+show_filtered_dashboard()
+
 st.divider()
-st.subheader("Analisis Volatilitas Kasus Harian")
 
-if not df_filtered.empty and len(negara_selected) > 0:
-    volatility_data = []
-    
-    for negara in negara_selected:
-        country_data = df_filtered[df_filtered["negara"] == negara]
-        if len(country_data) > 1:
-            # Hitung standar deviasi kasus harian
-            std_dev = country_data["kasus_harian"].std()
-            mean_val = country_data["kasus_harian"].mean()
-            cv = (std_dev / mean_val * 100) if mean_val > 0 else 0
-            
-            # Hitung range (max-min)
-            max_val = country_data["kasus_harian"].max()
-            min_val = country_data["kasus_harian"].min()
-            
-            volatility_data.append({
-                "Negara": negara,
-                "Rata-rata Harian": f"{mean_val:,.0f}",
-                "Standar Deviasi": f"{std_dev:,.0f}",
-                "Koefisien Variasi": f"{cv:.1f}%",
-                "Rentang (Max-Min)": f"{max_val:,.0f} - {min_val:,.0f}"
-            })
-    
-    if volatility_data:
-        df_volatility = pd.DataFrame(volatility_data)
-        # Responsive dataframe height
-        volatility_height = min(300, len(df_volatility) * 35 + 40)
-        st.dataframe(
-            df_volatility,
-            use_container_width=True,
-            hide_index=True,
-            height=volatility_height
-        )
-        
-        # Insight volatilitas
-        highest_cv = max(volatility_data, key=lambda x: float(x["Koefisien Variasi"].replace("%", "")))
-        
-        st.markdown(
-            f"""
-            **Insight Volatilitas:**  
-            **{highest_cv['Negara']}** menunjukkan volatilitas tertinggi (CV: {highest_cv['Koefisien Variasi']}), 
-            mengindikasikan fluktuasi kasus harian yang sangat tidak stabil. 
-            Volatilitas tinggi biasanya disebabkan oleh: (1) Perubahan drastis kebijakan, 
-            (2) Gelombang infeksi yang tajam, (3) Variasi kapasitas testing harian, 
-            (4) Pelaporan yang tidak konsisten. Negara dengan CV rendah cenderung memiliki 
-            pola kasus yang lebih stabil dan predictable.
-            """
-        )
-    else:
-        st.info("Data tidak cukup untuk analisis volatilitas.")
-else:
-    st.info("Pilih minimal satu negara untuk analisis volatilitas.")
+# ==============================
+# KONTRIBUSI GLOBAL - DATA KUMULATIF
+# ==============================
+# Tanggal global terbaru
+latest_global_date = max_date
+
+# Data global (TIDAK TERFILTER)
+show_global_pie(df, latest_global_date)
+
+st.divider()
+
+# ==============================
+# TOP 10 COUNTRIES - TOTAL KASUS
+# ==============================
+show_top10(df)
 
 # ==============================
 # FOOTER
@@ -732,8 +995,8 @@ st.caption(
     **COVID-19 Global Analytics Dashboard**  
     Dibangun dengan Python, Pandas,  Plotly, Streamlit  
     Data terakhir diperbarui: {latest_global_date.date()}  
-    Total negara dalam dataset: {len(df['negara'].unique())}  
-    Rentang data: {df['tanggal'].min().date()} hingga {df['tanggal'].max().date()}
+    Total negara dalam dataset: {len(negara_list)}  
+    Rentang data: {min_date.date()} hingga {max_date.date()}
     """
 )
 